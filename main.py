@@ -1,18 +1,56 @@
 import requests
-import schedule
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from cachetools import TTLCache
 import os
-import json
+import orjson
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta, date
 
 # 환경변수
 FRED_API_KEY = os.getenv('FRED_API_KEY')
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')
+TEST_MODE = os.getenv('TEST_MODE') == '1'
 
 # 한국 시간대
 KST = timezone(timedelta(hours=9))
 
+# HTTP 세션 (FRED/텔레그램 연결 재사용)
+SESSION = requests.Session()
+SESSION.headers['Connection'] = 'keep-alive'
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+))
+# 텔레그램 sendMessage는 멱등이 아니므로 429 응답에만 재시도 (읽기 타임아웃 재시도 금지)
+SESSION.mount('https://api.telegram.org', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=2,
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429],
+        allowed_methods=['POST']
+    )
+))
+
+# FRED 응답 캐시 (지표는 최대 월 1회 갱신되므로 6시간 보관)
+FRED_CACHE = TTLCache(maxsize=32, ttl=6 * 3600)
+FRED_CACHE_LOCK = threading.Lock()
+# 마지막 성공 응답 (네트워크 오류 시 대체값)
+FRED_LAST_OBSERVATIONS = {}
+
 # 주요 경제지표 정의
 ECONOMIC_INDICATORS = {
     'UNRATE': {
@@ -47,34 +85,34 @@ ECONOMIC_INDICATORS = {
     }
 }
 
+# 중요도별 지표 순서 (정의 순서 유지)
+CRITICAL_SERIES = tuple(sid for sid, info in ECONOMIC_INDICATORS.items() if info['importance'] == 'critical')
+IMPORTANT_SERIES = tuple(sid for sid, info in ECONOMIC_INDICATORS.items() if info['importance'] == 'important')
+
+# 변화 방향별 이모지 (하락, 보합, 상승)
+CHANGE_EMOJIS = ("📉", "➡️", "📈")
+
+# 브리핑 메시지 머리말/꼬리말 템플릿
+HEADER_TMPL = "🇺🇸 <b>미국 경제지표 브리핑</b>\n📅 {date} 발송\n\n<b>📊 주요 지표:</b>"
+IMPORTANT_SECTION = "\n<b>📈 기타 지표:</b>"
+FOOTER_TMPL = (
+    "\n\n<b>📊 브리핑 요약:</b>\n"
+    "최신 미국 경제지표를 확인하세요.\n\n"
+    "⏰ {time} (KST) 발송\n"
+    "🔄 다음 브리핑: 내일 오전 7:30"
+)
+
 def get_korean_time():
     """현재 한국 시간 반환"""
     return datetime.now(KST)
 
-def is_business_day():
-    """평일인지 확인 (월-금)"""
-    korean_time = get_korean_time()
-    weekday = korean_time.weekday()
-    return weekday < 5
-
-def should_send_briefing():
-    """브리핑을 보내야 하는 시간인지 확인"""
-    if not is_business_day():
-        print("📅 주말이므로 브리핑을 건너뜁니다.")
-        return False
-    
-    korean_time = get_korean_time()
-    hour = korean_time.hour
-    minute = korean_time.minute
-    
-    # 오전 7시 30분에만 전송
-    if hour == 7 and minute == 30:
-        return True
-    
-    return False
-
 def get_fred_data(series_id, limit=10):
-    """FRED API에서 경제지표 데이터 가져오기"""
+    """FRED API에서 경제지표 데이터 가져오기 (TTL 캐시)"""
+    cache_key = (series_id, limit)
+    with FRED_CACHE_LOCK:
+        if cache_key in FRED_CACHE:
+            return FRED_CACHE[cache_key]
+    
     url = "https://api.stlouisfed.org/fred/series/observations"
     params = {
         'series_id': series_id,
@@ -85,38 +123,57 @@ def get_fred_data(series_id, limit=10):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = SESSION.get(url, params=params, timeout=30)
         if response.status_code == 200:
-            data = response.json()
-            return data.get('observations', [])
+            data = orjson.loads(response.content)
+            observations = data.get('observations') if isinstance(data, dict) else None
+            # 비어 있거나 형식이 다른 응답은 캐시하지 않고 이전 데이터 사용
+            if isinstance(observations, list) and observations:
+                with FRED_CACHE_LOCK:
+                    FRED_CACHE[cache_key] = observations
+                    FRED_LAST_OBSERVATIONS[cache_key] = observations
+                return observations
+            print(f"❌ FRED API 응답 형식 오류 ({series_id})")
         else:
             print(f"❌ FRED API 오류 ({series_id}): {response.status_code}")
-            return []
-    except Exception as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         print(f"🚨 FRED API 예외 ({series_id}): {e}")
-        return []
+    
+    # 실패 시 마지막으로 받은 데이터 사용
+    with FRED_CACHE_LOCK:
+        stale = FRED_LAST_OBSERVATIONS.get(cache_key)
+    if stale:
+        print(f"♻️ 이전 데이터 사용 ({series_id})")
+        return stale
+    return []
 
 def get_latest_indicators():
-    """최신 경제지표 데이터 수집"""
+    """최신 경제지표 데이터 수집 (병렬)"""
     indicators_data = {}
     
-    for series_id, info in ECONOMIC_INDICATORS.items():
-        print(f"📊 {info['name']} 데이터 수집 중...")
+    with ThreadPoolExecutor(max_workers=len(ECONOMIC_INDICATORS)) as ex:
+        futures = {}
+        for series_id, info in ECONOMIC_INDICATORS.items():
+            print(f"📊 {info['name']} 데이터 수집 중...")
+            futures[ex.submit(get_fred_data, series_id)] = (series_id, info)
         
-        observations = get_fred_data(series_id)
-        if observations:
-            latest = observations[0]
-            previous = observations[1] if len(observations) > 1 else None
-            
-            indicators_data[series_id] = {
-                'info': info,
-                'latest_value': latest.get('value'),
-                'latest_date': latest.get('date'),
-                'previous_value': previous.get('value') if previous else None,
-                'previous_date': previous.get('date') if previous else None
-            }
+        for future in as_completed(futures):
+            series_id, info = futures[future]
+            observations = future.result()
+            if observations:
+                latest = observations[0]
+                previous = observations[1] if len(observations) > 1 else None
+                
+                indicators_data[series_id] = {
+                    'info': info,
+                    'latest_value': latest.get('value'),
+                    'latest_date': latest.get('date'),
+                    'previous_value': previous.get('value') if previous else None,
+                    'previous_date': previous.get('date') if previous else None
+                }
     
-    return indicators_data
+    # 완료 순서와 무관하게 정의된 순서 유지
+    return {sid: indicators_data[sid] for sid in ECONOMIC_INDICATORS if sid in indicators_data}
 
 def calculate_change(current, previous):
     """변화율 계산"""
@@ -135,35 +192,22 @@ def format_change(change):
     """변화를 이모지와 함께 포맷"""
     if change is None:
         return "📊 N/A"
-    elif change > 0:
-        return f"📈 +{change:.2f}"
-    elif change < 0:
-        return f"📉 {change:.2f}"
-    else:
-        return f"➡️ {change:.2f}"
+    sign = (change > 0) - (change < 0)
+    sign_str = "+" if sign > 0 else ""
+    return f"{CHANGE_EMOJIS[sign + 1]} {sign_str}{change:.2f}"
 
 def format_economic_briefing(indicators_data):
     """경제지표 브리핑 메시지 포맷"""
     korean_time = get_korean_time()
     
-    # 중요도별 정렬
-    critical_indicators = []
-    important_indicators = []
-    
-    for series_id, data in indicators_data.items():
-        if data['info']['importance'] == 'critical':
-            critical_indicators.append((series_id, data))
-        elif data['info']['importance'] == 'important':
-            important_indicators.append((series_id, data))
-    
     # 메시지 구성
-    message = f"""🇺🇸 <b>미국 경제지표 브리핑</b>
-📅 {korean_time.strftime('%Y년 %m월 %d일')} 발송
-
-<b>📊 주요 지표:</b>"""
+    parts = [HEADER_TMPL.format(date=korean_time.strftime('%Y년 %m월 %d일'))]
     
     # 중요 지표들
-    for series_id, data in critical_indicators:
+    for series_id in CRITICAL_SERIES:
+        data = indicators_data.get(series_id)
+        if data is None:
+            continue
         info = data['info']
         current = data['latest_value']
         previous = data['previous_value']
@@ -173,25 +217,26 @@ def format_economic_briefing(indicators_data):
             change = calculate_change(current, previous)
             change_str = format_change(change)
             
-            message += f"""
-- <b>{info['name']}</b>: {current}{info['unit']} {change_str}"""
+            line = f"- <b>{info['name']}</b>: {current}{info['unit']} {change_str}"
             
             if latest_date:
                 # 날짜 포맷팅 (2024-08-01 형태)
                 try:
-                    date_obj = datetime.strptime(latest_date, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%m/%d')
-                    message += f" ({formatted_date})"
-                except:
+                    d = date.fromisoformat(latest_date)
+                    line += f" ({d.month:02d}/{d.day:02d})"
+                except (TypeError, ValueError):
                     pass
+            
+            parts.append(line)
     
     # 일반 지표들
-    if important_indicators:
-        message += f"""
-
-<b>📈 기타 지표:</b>"""
+    if any(series_id in indicators_data for series_id in IMPORTANT_SERIES):
+        parts.append(IMPORTANT_SECTION)
         
-        for series_id, data in important_indicators:
+        for series_id in IMPORTANT_SERIES:
+            data = indicators_data.get(series_id)
+            if data is None:
+                continue
             info = data['info']
             current = data['latest_value']
             previous = data['previous_value']
@@ -200,19 +245,10 @@ def format_economic_briefing(indicators_data):
                 change = calculate_change(current, previous)
                 change_str = format_change(change)
                 
-                message += f"""
-- {info['name']}: {current}{info['unit']} {change_str}"""
+                parts.append(f"- {info['name']}: {current}{info['unit']} {change_str}")
     
     # 시장 전망 (간단한 로직)
-    message += f"""
-
-<b>📊 브리핑 요약:</b>
-최신 미국 경제지표를 확인하세요.
-
-⏰ {korean_time.strftime('%H:%M')} (KST) 발송
-🔄 다음 브리핑: 내일 오전 7:30"""
-    
-    return message
+    return "\n".join(parts) + FOOTER_TMPL.format(time=korean_time.strftime('%H:%M'))
 
 def send_telegram_message(message):
     """텔레그램으로 메시지 전송"""
@@ -225,14 +261,14 @@ def send_telegram_message(message):
     }
     
     try:
-        response = requests.post(url, data=data, timeout=30)
+        response = SESSION.post(url, json=data, timeout=10)
         if response.status_code == 200:
             print("✅ 텔레그램 브리핑 전송 성공")
             return True
         else:
             print(f"❌ 텔레그램 전송 실패: {response.text}")
             return False
-    except Exception as e:
+    except requests.RequestException as e:
         print(f"🚨 텔레그램 오류: {e}")
         return False
 
@@ -240,9 +276,6 @@ def send_economic_briefing():
     """경제지표 브리핑 전송"""
     korean_time = get_korean_time()
     
-    if not should_send_briefing():
-        return
-    
     print(f"📊 경제지표 브리핑 준비 중... {korean_time.strftime('%H:%M:%S')}")
     
     # 경제지표 데이터 수집
@@ -286,33 +319,40 @@ def send_startup_message():
 
     send_telegram_message(startup_message)
 
-# 스케줄 설정: 매일 오전 7:30
-schedule.every().day.at("07:30").do(send_economic_briefing)
+# 스케줄 설정: 평일 오전 7:30 (KST)
+scheduler = BlockingScheduler(timezone=KST)
+scheduler.add_job(
+    send_economic_briefing,
+    CronTrigger(day_of_week='mon-fri', hour=7, minute=30, timezone=KST),
+    misfire_grace_time=600,
+    coalesce=True
+)
 
-# 테스트용: 매시간 정각에도 실행 (나중에 제거)
-schedule.every().hour.at(":00").do(send_economic_briefing)
+# 테스트용: TEST_MODE 설정 시 매시간 정각에도 실행
+if TEST_MODE:
+    scheduler.add_job(send_economic_briefing, CronTrigger(minute=0, timezone=KST), coalesce=True)
 
 print("🇺🇸 미국 경제지표 브리핑 봇이 시작되었습니다!")
 print(f"📊 FRED_API_KEY: {'✅ 설정됨' if FRED_API_KEY else '❌ 미설정'}")
 print(f"📱 BOT_TOKEN: {'✅ 설정됨' if BOT_TOKEN else '❌ 미설정'}")
 print(f"💬 CHAT_ID: {'✅ 설정됨' if CHAT_ID else '❌ 미설정'}")
+print(f"🧪 TEST_MODE: {'✅ 활성' if TEST_MODE else '❌ 비활성'}")
 
 korean_time = get_korean_time()
 print(f"🕐 현재 한국 시간: {korean_time.strftime('%Y-%m-%d %H:%M:%S')}")
-print(f"📅 평일 여부: {'✅ 평일' if is_business_day() else '❌ 주말'}")
+print(f"📅 평일 여부: {'✅ 평일' if korean_time.weekday() < 5 else '❌ 주말'}")
 
 # 시작 알림 및 테스트
 if FRED_API_KEY and BOT_TOKEN and CHAT_ID:
     send_startup_message()
     
-    # 즉시 테스트 브리핑 전송
-    print("🚀 테스트 브리핑을 전송합니다...")
-    send_economic_briefing()
+    # 즉시 테스트 브리핑 전송 (TEST_MODE 전용)
+    if TEST_MODE:
+        print("🚀 테스트 브리핑을 전송합니다...")
+        send_economic_briefing()
 else:
     print("⚠️ 환경변수가 설정되지 않았습니다!")
 
 # 스케줄러 실행
-print("⏰ 스케줄러 시작... (매일 오전 7:30 브리핑)")
-while True:
-    schedule.run_pending()
-    time.sleep(60)
+print("⏰ 스케줄러 시작... (평일 오전 7:30 브리핑)")
+scheduler.start()